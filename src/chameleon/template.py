@@ -436,6 +436,9 @@ class BaseTemplateFile(BaseTemplate):
             with open(self.filename, "rb") as f:
                 data = f.read()
 
+        return self._decode(data)
+
+    def _decode(self, data: bytes) -> str:
         body, encoding, content_type = read_bytes(data, self.default_encoding)
 
         self.content_type = content_type or self.default_content_type
@@ -1,12 +1,99 @@
 import os
+import shutil
 import sys
 import tempfile
 import unittest
 import zipimport
+from importlib.util import find_spec
 from importlib.util import module_from_spec
 from pathlib import Path
 
 
+ROOT = os.path.dirname(__file__)
+INPUTS = os.path.join(ROOT, "inputs")
+PKG_NAME = 'chameleon_test_pkg'
+HAS_SETUPTOOLS = find_spec('setuptools') is not None
+
+# Templates included in the test package, by filename.
+PKG_TEMPLATES = {
+    'test.pt': "<html><body>${content}</body></html>",
+    'macro1.pt': (
+        f'<html metal:use-macro="load: {PKG_NAME}:templates/test.pt" />'
+    ),
+    'macro2.pt': '<html metal:use-macro="load: test.pt" />',
+}
+
+# Building a distribution is by far the most expensive part of the
+# package loading tests; each archive is built once and then shared
+# between the test classes.
+_packages = {}
+_build_dirs = []
+
+
+def tearDownModule():
+    for path in _build_dirs:
+        shutil.rmtree(path, ignore_errors=True)
+    del _build_dirs[:]
+    _packages.clear()
+
+
+def has_bdist_wheel():
+    if find_spec('wheel') is not None:
+        return True
+
+    # Since version 70.1, setuptools ships its own bdist_wheel command;
+    # checking for it imports setuptools, so we only do it when needed.
+    try:
+        return find_spec('setuptools.command.bdist_wheel') is not None
+    except ImportError:
+        return False
+
+
+def build_package(command, pkg_extension):
+    try:
+        return _packages[command]
+    except KeyError:
+        pass
+
+    tmpdir = tempfile.mkdtemp(prefix='chameleon-tests')
+    _build_dirs.append(tmpdir)
+
+    basedir = Path(tmpdir) / PKG_NAME
+    pkgdir = basedir / 'src' / PKG_NAME
+    templatesdir = pkgdir / 'templates'
+    templatesdir.mkdir(parents=True)
+
+    basedir.joinpath('MANIFEST.in').write_text('recursive-include src *.pt')
+    pkgdir.joinpath('__init__.py').touch()
+    for name, source in PKG_TEMPLATES.items():
+        templatesdir.joinpath(name).write_text(source)
+
+    olddir = os.getcwd()
+    os.chdir(basedir)
+
+    try:
+        from setuptools import find_packages
+        from setuptools import setup
+
+        setup(
+            name=PKG_NAME,
+            version="1.0",
+            packages=find_packages('src'),
+            package_dir={'': 'src'},
+            include_package_data=True,
+            script_args=['--quiet', command],
+        )
+    finally:
+        os.chdir(olddir)
+
+    found = list(basedir.glob('dist/*' + pkg_extension))
+    assert len(found) == 1, \
+        "Expected a single %s archive, got: %r." % (pkg_extension, found)
+    package_path = found[0]
+    _packages[command] = package_path
+    return package_path
+
+
 class LoadTests:
     def _makeOne(self, *args, **kwargs):
         klass = self._getTargetClass()
@@ -17,117 +104,69 @@ class LoadTests:
         return TemplateLoader
 
     def test_load_relative(self):
-        import os
-        here = os.path.join(os.path.dirname(__file__), "inputs")
-        loader = self._makeOne(search_path=[here])
+        loader = self._makeOne(search_path=[INPUTS])
         result = self._load(loader, 'hello_world.pt')
         self.assertEqual(
             result.filename,
-            os.path.join(here, 'hello_world.pt'))
+            os.path.join(INPUTS, 'hello_world.pt'))
 
     def test_load_relative_default_extension(self):
-        import os
-        here = os.path.join(os.path.dirname(__file__), "inputs")
-        loader = self._makeOne([here], ".pt")
+        loader = self._makeOne([INPUTS], ".pt")
         result = self._load(loader, 'hello_world')
         self.assertEqual(
             result.filename,
-            os.path.join(here, 'hello_world.pt'))
+            os.path.join(INPUTS, 'hello_world.pt'))
 
     def test_consecutive_loads(self):
-        import os
-        here = os.path.join(os.path.dirname(__file__), "inputs")
-        loader = self._makeOne(search_path=[here])
+        loader = self._makeOne(search_path=[INPUTS])
 
         self.assertTrue(
             self._load(loader, 'hello_world.pt') is
             self._load(loader, 'hello_world.pt'))
 
     def test_load_relative_badpath_in_searchpath(self):
-        import os
-        here = os.path.join(os.path.dirname(__file__), "inputs")
-        loader = self._makeOne(search_path=[os.path.join(here, 'none'), here])
+        loader = self._makeOne(
+            search_path=[os.path.join(INPUTS, 'none'), INPUTS])
         result = self._load(loader, 'hello_world.pt')
         self.assertEqual(
             result.filename,
-            os.path.join(here, 'hello_world.pt'))
+            os.path.join(INPUTS, 'hello_world.pt'))
 
     def test_load_abs(self):
-        import os
-        here = os.path.join(os.path.dirname(__file__), "inputs")
         loader = self._makeOne()
-        abs = os.path.join(here, 'hello_world.pt')
+        abs = os.path.join(INPUTS, 'hello_world.pt')
         result = self._load(loader, abs)
         self.assertEqual(result.filename, abs)
 
+    @unittest.skipUnless(HAS_SETUPTOOLS, "setuptools is not available")
     def test_load_egg(self):
         self._test_load_package("bdist_egg", ".egg")
 
+    @unittest.skipUnless(HAS_SETUPTOOLS, "setuptools is not available")
     def test_load_wheel(self):
+        if not has_bdist_wheel():
+            self.skipTest("bdist_wheel command is not available")
         self._test_load_package("bdist_wheel", ".whl")
 
     def _test_load_package(self, command, pkg_extension):
-        with tempfile.TemporaryDirectory() as tmpdir:
-            pkg_name = 'chameleon_test_pkg'
-            basedir = Path(tmpdir) / pkg_name
-            pkgdir = basedir / 'src' / pkg_name
-            templatesdir = pkgdir / 'templates'
-            templatesdir.mkdir(parents=True)
-
-            olddir = os.getcwd()
-            os.chdir(basedir)
-
-            try:
-                with open('MANIFEST.in', 'w') as f:
-                    f.write('recursive-include src *.pt')
-
-                pkgdir.joinpath('__init__.py').touch()
-                with templatesdir.joinpath('test.pt').open('w') as f:
-                    f.write("<html><body>${content}</body></html>")
-                with templatesdir.joinpath('macro1.pt').open('w') as f:
-                    f.write(
-                        f'<html metal:use-macro="'
-                        f'load: {pkg_name}:templates/test.pt" />'
-                    )
-                with templatesdir.joinpath('macro2.pt').open('w') as f:
-                    f.write(
-                        '<html metal:use-macro="load: test.pt" />'
-                    )
-
-                from setuptools import find_packages
-                from setuptools import setup
-
-                setup(
-                    name=pkg_name,
-                    version="1.0",
-                    packages=find_packages('src'),
-                    package_dir={'': 'src'},
-                    include_package_data=True,
-                    script_args=[command],
-                )
-            finally:
-                os.chdir(olddir)
-
-            (package_path,) = basedir.glob('dist/*' + pkg_extension)
-
-            importer = zipimport.zipimporter(str(package_path))
-            if hasattr(importer, 'find_spec'):
-                spec = importer.find_spec(pkg_name)
-                module = module_from_spec(spec)
-                importer.exec_module(module)
-                sys.modules[pkg_name] = module
-            else:
-                importer.load_module(pkg_name)
-
-            try:
-                self._test_pkg(pkg_name)
-            finally:
-                # Manually clean up archive.
-                # See https://github.com/python/cpython/issues/87319.
-                os.unlink(importer.archive)
-
-                # Remove imported module.
-                sys.modules.pop(pkg_name, None)
+        package_path = build_package(command, pkg_extension)
+
+        importer = zipimport.zipimporter(str(package_path))
+        if sys.version_info >= (3, 10):
+            # Mirror the import system: the module is registered before
+            # its code runs.
+            spec = importer.find_spec(PKG_NAME)
+            module = module_from_spec(spec)
+            sys.modules[PKG_NAME] = module
+            spec.loader.exec_module(module)
+        else:
+            importer.load_module(PKG_NAME)
+
+        try:
+            self._test_pkg(PKG_NAME)
+        finally:
+            # Remove imported module.
+            sys.modules.pop(PKG_NAME, None)
 
     def _test_pkg(self, pkg_name):
         loader = self._makeOne(auto_reload=True)
@@ -171,7 +210,6 @@ class ModuleLoadTests(unittest.TestCase):
         return ModuleLoader(*args, **kwargs)
 
     def test_build(self):
-        import tempfile
         path = tempfile.mkdtemp()
         loader = self._makeOne(path)
         source = "def function(): return %r" % "\xc3\xa6\xc3\xb8\xc3\xa5"
@@ -185,19 +223,15 @@ class ModuleLoadTests(unittest.TestCase):
         result2 = d['function']()
         self.assertEqual(result1, result2)
 
-        import os
         self.assertTrue("test.py" in os.listdir(path))
 
-        import shutil
         shutil.rmtree(path)
 
 
 class ZPTLoadTests(unittest.TestCase):
     def _makeOne(self, *args, **kwargs):
-        import os
-        here = os.path.join(os.path.dirname(__file__), "inputs")
         from chameleon.zpt import loader
-        return loader.TemplateLoader(here, **kwargs)
+        return loader.TemplateLoader(INPUTS, **kwargs)
 
     def test_load_xml(self):
         loader = self._makeOne()
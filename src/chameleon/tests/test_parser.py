@@ -1,14 +1,33 @@
+import glob
+import os
+import traceback
+from doctest import Example
+from doctest import OutputChecker
 from unittest import TestCase
 
 from chameleon.namespaces import PY_NS
 from chameleon.namespaces import XML_NS
 from chameleon.namespaces import XMLNS_NS
+from chameleon.parser import ElementParser
+from chameleon.parser import match_double_hyphen
+from chameleon.tokenize import iter_xml
+from chameleon.utils import read_encoded
+
+
+INPUTS = os.path.join(os.path.dirname(__file__), "inputs")
+
+# The checker holds no state between comparisons.
+output_checker = OutputChecker()
+
+DEFAULT_NAMESPACES = {
+    'xmlns': XMLNS_NS,
+    'xml': XML_NS,
+    'py': PY_NS,
+}
 
 
 class ParserTest(TestCase):
     def test_comment_double_hyphen_parsing(self):
-        from chameleon.parser import match_double_hyphen
-
         self.assertFalse(match_double_hyphen.match('->'))
         self.assertFalse(match_double_hyphen.match('-->'))
         self.assertFalse(match_double_hyphen.match('--->'))
@@ -18,84 +37,69 @@ class ParserTest(TestCase):
         self.assertTrue(match_double_hyphen.match('-- >'))
 
     def test_sample_files(self):
-        import os
-        import traceback
-        path = os.path.join(os.path.dirname(__file__), "inputs")
-        for filename in os.listdir(path):
-            if not filename.endswith('.html'):
-                continue
-
-            with open(os.path.join(path, filename), 'rb') as f:
-                source = f.read()
-
-            from chameleon.utils import read_encoded
-            try:
-                want = read_encoded(source)
-            except UnicodeDecodeError as exc:
-                self.fail("{} - {}".format(exc, filename))
-
-            from chameleon.parser import ElementParser
-            from chameleon.tokenize import iter_xml
-            try:
-                tokens = iter_xml(want)
-                parser = ElementParser(tokens, {
-                    'xmlns': XMLNS_NS,
-                    'xml': XML_NS,
-                    'py': PY_NS,
-                })
-                elements = tuple(parser)
-            except BaseException:
-                self.fail(traceback.format_exc())
-
-            output = []
-
-            def render(kind, args):
-                if kind == 'element':
-                    # start tag
-                    tag, end, children = args
-                    output.append("%(prefix)s%(name)s" % tag)
-
-                    for attr in tag['attrs']:
-                        output.append(
-                            "%(space)s"
-                            "%(name)s"
-                            "%(eq)s"
-                            "%(quote)s"
-                            "%(value)s"
-                            "%(quote)s" % attr)
-
-                    output.append("%(suffix)s" % tag)
-
-                    # children
-                    for item in children:
-                        render(*item)
-
-                    # end tag
-                    output.append(
-                        "%(prefix)s%(name)s%(space)s%(suffix)s" % end
+        for path in sorted(glob.glob(os.path.join(INPUTS, '*.html'))):
+            with self.subTest(filename=os.path.basename(path)):
+                self._check_sample_file(path)
+
+    def _check_sample_file(self, path):
+        filename = os.path.basename(path)
+        with open(path, 'rb') as f:
+            source = f.read()
+
+        try:
+            want = read_encoded(source)
+        except UnicodeDecodeError as exc:
+            self.fail("{} - {}".format(exc, filename))
+
+        try:
+            tokens = iter_xml(want)
+            parser = ElementParser(tokens, DEFAULT_NAMESPACES)
+            elements = tuple(parser)
+        except BaseException:
+            self.fail(traceback.format_exc())
+
+        output = []
+        append = output.append
+
+        # Render the element tree using an explicit stack; the end
+        # tag of an element is pushed below its children (as a private
+        # '_close' item) so that it is emitted once they have all been
+        # rendered.
+        stack = list(reversed(elements))
+        while stack:
+            kind, args = stack.pop()
+            if kind == 'element':
+                # start tag
+                tag, end, children = args
+                append(tag['prefix'] + tag['name'])
+
+                for attr in tag['attrs']:
+                    quote = attr['quote']
+                    append(
+                        f"{attr['space']}{attr['name']}{attr['eq']}"
+                        f"{quote}{attr['value']}{quote}"
                     )
-                elif kind == 'text':
-                    text = args[0]
-                    output.append(text)
-                elif kind == 'start_tag':
-                    node = args[0]
-                    output.append(
-                        "%(prefix)s%(name)s%(space)s%(suffix)s" % node
-                    )
-                else:
-                    raise RuntimeError("Not implemented: %s." % kind)
-
-            for kind, args in elements:
-                render(kind, args)
-
-            got = "".join(output)
-
-            from doctest import OutputChecker
-            checker = OutputChecker()
 
-            if checker.check_output(want, got, 0) is False:
-                from doctest import Example
-                example = Example(f.name, want)
-                diff = checker.output_difference(
-                    example, got, 0)
-                self.fail("({}) - \n{}".format(f.name, diff))
+                append(tag['suffix'])
+
+                stack.append(('_close', (end, )))
+                stack.extend(reversed(children))
+            elif kind == 'text':
+                text = args[0]
+                append(text)
+            elif kind in ('start_tag', '_close'):
+                node = args[0]
+                append(
+                    f"{node['prefix']}{node['name']}"
+                    f"{node['space']}{node['suffix']}"
+                )
+            else:
+                raise RuntimeError("Not implemented: %s." % kind)
+
+        got = "".join(output)
+
+        if output_checker.check_output(want, got, 0) is False:
+            example = Example(f.name, want)
+            diff = output_checker.output_difference(
+                example, got, 0)
+            self.fail("({}) - \n{}".format(f.name, diff))
@@ -1,53 +1,57 @@
-import os
-import shutil
-import tempfile
 import unittest
 
-from chameleon.utils import encode_string
+from chameleon.template import BaseTemplateFile
+from chameleon.utils import read_bytes
+from chameleon.utils import xml_prefixes
 
 
-class TypeSniffingTestCase(unittest.TestCase):
-    def setUp(self):
-        self.tempdir = tempfile.mkdtemp(prefix='chameleon-tests')
+# XML documents with a declaration; the sniffer must recognize these
+# in each of the encodings it supports.
+XML_DOCUMENTS = (
+    "<?xml version='1.0' encoding='ascii'?><doc/>",
+    "<?xml\tversion='1.0' encoding='ascii'?><doc/>",
+)
 
-    def tearDown(self):
-        shutil.rmtree(self.tempdir)
+# HTML document which declares its encoding using a meta tag.
+HTML_WINDOWS_1251 = (
+    b'<html><head><title>'
+    b'\xc3\x83\xc2\x92\xc3\x83\xc2\xa5'
+    b'\xc3\x83\xc2\xb1\xc3\x83\xc2\xb2'
+    b'</title><meta http-equiv="Content-Type"'
+    b' content="text/html; charset=windows-1251"/>'
+    b"</head></html>")
 
-    def _get_temporary_file(self):
-        filename = os.path.join(self.tempdir, 'template.py')
-        assert not os.path.exists(filename)
-        f = open(filename, 'w')
-        f.flush()
-        f.close()
-        return filename
 
-    def get_template(self, text):
-        fn = self._get_temporary_file()
+class DummyTemplateFile(BaseTemplateFile):
+    """Template file which reads its data from memory.
+
+    The data is decoded by ``BaseTemplateFile._decode``, the same
+    sniffing logic ``BaseTemplateFile.read`` uses, without a roundtrip
+    to disk.
+    """
 
-        with open(fn, 'wb') as tmpfile:
-            tmpfile.write(text)
+    def __init__(self, data, **config):
+        self.data = data
+        super().__init__('<memory>', **config)
 
-        from chameleon.template import BaseTemplateFile
+    def read(self):
+        return self._decode(self.data)
 
-        class DummyTemplateFile(BaseTemplateFile):
-            def cook(self, body):
-                self.body = body
+    def cook(self, body):
+        self.body = body
 
-        template = DummyTemplateFile(fn)
+
+class TypeSniffingTestCase(unittest.TestCase):
+    def get_template(self, text):
+        template = DummyTemplateFile(text)
         template.cook_check()
         return template
 
     def check_content_type(self, text, expected_type):
-        from chameleon.utils import read_bytes
         content_type = read_bytes(text, 'ascii')[2]
         self.assertEqual(content_type, expected_type)
 
     def test_xml_encoding(self):
-        from chameleon.utils import xml_prefixes
-
-        document1 = "<?xml version='1.0' encoding='ascii'?><doc/>"
-        document2 = "<?xml\tversion='1.0' encoding='ascii'?><doc/>"
-
         for bom, encoding in xml_prefixes:
             try:
                 "".encode(encoding)
@@ -55,8 +59,10 @@ class TypeSniffingTestCase(unittest.TestCase):
                 # System does not support this encoding
                 continue
 
-            self.check_content_type(document1.encode(encoding), "text/xml")
-            self.check_content_type(document2.encode(encoding), "text/xml")
+            for document in XML_DOCUMENTS:
+                with self.subTest(encoding=encoding, document=document):
+                    self.check_content_type(
+                        document.encode(encoding), "text/xml")
 
     HTML_PUBLIC_ID = "-//W3C//DTD HTML 4.01 Transitional//EN"
     HTML_SYSTEM_ID = "http://www.w3.org/TR/html4/loose.dtd"
@@ -78,33 +84,29 @@ class TypeSniffingTestCase(unittest.TestCase):
         self.check_content_type("<doc><element/></doc>", "text/xml")
 
     def test_html_default_encoding(self):
-        body = encode_string(
-            '<html><head><title>'
-            '\xc3\x90\xc2\xa2\xc3\x90\xc2\xb5'
-            '\xc3\x91\xc2\x81\xc3\x91\xc2\x82'
-            '</title></head></html>')
+        body = (
+            b'<html><head><title>'
+            b'\xc3\x83\xc2\x90\xc3\x82\xc2\xa2'
+            b'\xc3\x83\xc2\x90\xc3\x82\xc2\xb5'
+            b'\xc3\x83\xc2\x91\xc3\x82\xc2\x81'
+            b'\xc3\x83\xc2\x91\xc3\x82\xc2\x82'
+            b'</title></head></html>')
 
         template = self.get_template(body)
         self.assertEqual(template.body, body.decode('utf-8'))
+        self.assertEqual(template.content_encoding, 'utf-8')
+        self.assertIsNone(template.content_type)
 
     def test_html_encoding_by_meta(self):
-        body = encode_string(
-            '<html><head><title>'
-            '\xc3\x92\xc3\xa5\xc3\xb1\xc3\xb2'
-            '</title><meta http-equiv="Content-Type"'
-            ' content="text/html; charset=windows-1251"/>'
-            "</head></html>")
-
+        body = HTML_WINDOWS_1251
         template = self.get_template(body)
         self.assertEqual(template.body, body.decode('windows-1251'))
+        self.assertEqual(template.content_encoding, 'windows-1251')
+        self.assertEqual(template.content_type, 'text/html')
 
     def test_xhtml(self):
-        body = encode_string(
-            '<html><head><title>'
-            '\xc3\x92\xc3\xa5\xc3\xb1\xc3\xb2'
-            '</title><meta http-equiv="Content-Type"'
-            ' content="text/html; charset=windows-1251"/>'
-            "</head></html>")
-
+        body = HTML_WINDOWS_1251
         template = self.get_template(body)
         self.assertEqual(template.body, body.decode('windows-1251'))
+        self.assertEqual(template.content_encoding, 'windows-1251')
+        self.assertEqual(template.content_type, 'text/html')
@@ -1,41 +1,85 @@
-import glob
 import os
 import re
 import sys
+import tempfile
+import traceback
+from doctest import Example
+from doctest import OutputChecker
+from functools import lru_cache
 from functools import partial
-from functools import wraps
 
 import pytest
 
+from chameleon.compiler import COMPILER_INTERNALS_OR_DISALLOWED
+from chameleon.config import DEBUG_MODE
+from chameleon.exc import ExpressionError
+from chameleon.exc import ParseError
 from chameleon.exc import RenderError
 from chameleon.exc import TemplateError
+from chameleon.exc import TranslationError
+from chameleon.loader import ModuleLoader
+from chameleon.loader import TemplateLoader
 from chameleon.tales import DEFAULT_MARKER
+from chameleon.template import BaseTemplateFile
+from chameleon.utils import create_formatted_exception
+from chameleon.utils import detect_encoding
+from chameleon.utils import read_xml_encoding
+from chameleon.zpt.template import PageTemplate
+from chameleon.zpt.template import PageTemplateFile
+from chameleon.zpt.template import PageTextTemplateFile
 
 
 ROOT = os.path.dirname(__file__)
+INPUTS = os.path.join(ROOT, "inputs")
+OUTPUTS = os.path.join(ROOT, "outputs")
+
+# Matches the ``${name}`` mapping variables in a translation default.
+mapping_re = re.compile(r'\${([a-z_]+)}')
+
+# The checker holds no state between comparisons.
+output_checker = OutputChecker()
+
+
+def normalize_newlines(text):
+    # same result as '\n'.join(text.splitlines()) for the newline
+    # conventions used in the fixtures, without the list of lines
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if text.endswith('\n'):
+        text = text[:-1]
+    return text
+
+
+@lru_cache(maxsize=None)
+def listdir(path):
+    # both the .pt and the .txt cases are collected from the same
+    # directories; list each of them just once
+    with os.scandir(path) as entries:
+        return sorted(entry.name for entry in entries)
 
 
 def find_files(ext):
-    inputs = os.path.join(ROOT, "inputs")
-    outputs = os.path.join(ROOT, "outputs")
-    found = []
-    for filename in sorted(os.listdir(inputs)):
-        name, extension = os.path.splitext(filename)
-        if extension != ext:
+    # index the output files by their numeric prefix, e.g. "001"
+    # for both "001.pt" and "001-en.pt"
+    index = {}
+    for filename in listdir(OUTPUTS):
+        if not filename.endswith(ext):
             continue
-        path = os.path.join(inputs, filename)
+        prefix = filename[:-len(ext)].split('-', 1)[0]
+        index.setdefault(prefix, []).append(os.path.join(OUTPUTS, filename))
 
-        # if there's no output file, treat document as static and
-        # expect input equal to output
-        globbed = tuple(glob.iglob(os.path.join(
-            outputs, "{}*{}".format(name.split('-', 1)[0], ext))))
+    found = []
+    for filename in listdir(INPUTS):
+        if not filename.endswith(ext):
+            continue
+        name = filename[:-len(ext)]
+        path = os.path.join(INPUTS, filename)
 
-        if not globbed:
+        matched = index.get(name.split('-', 1)[0])
+        if not matched:
             raise RuntimeError("Missing output for: %s." % name)
 
-        for output in globbed:
-            name, ext = os.path.splitext(output)
-            basename = os.path.basename(name)
+        for output in matched:
+            basename = os.path.basename(output)[:-len(ext)]
             if '-' in basename:
                 language = basename.split('-')[1]
             else:
@@ -44,7 +88,15 @@ def find_files(ext):
             base = len(ROOT) + 1
             found.append((path[base:], output[base:], language))
 
-    return pytest.mark.parametrize("input_path,output_path,language", found)
+    # e.g. "001-variable-scope.pt" or "011-messages.pt-en"
+    ids = [
+        os.path.basename(path) + ('-' + language if language else '')
+        for path, _, language in found
+    ]
+
+    return pytest.mark.parametrize(
+        "input_path,output_path,language", found, ids=ids
+    )
 
 
 class Message:
@@ -52,36 +104,55 @@ class Message:
         return "message"
 
 
-class TestTemplateFile:
-    @property
-    def _class(self):
-        from chameleon.template import BaseTemplateFile
+class Literal:
+    def __init__(self, s):
+        self.s = s
 
-        class TestTemplateFile(BaseTemplateFile):
-            cook_count = 0
+    def __html__(self):
+        return self.s
 
-            def cook(self, body):
-                self.cook_count += 1
-                self._cooked = True
+    def __str__(self):
+        raise RuntimeError(
+            "%r is a literal." % self.s)
+
+
+class CountingTemplateFile(BaseTemplateFile):
+    cook_count = 0
+
+    def cook(self, body):
+        self.cook_count += 1
+        self._cooked = True
+
+
+@pytest.fixture(scope='class')
+def tempdir(tmp_path_factory):
+    return tmp_path_factory.mktemp('templates')
 
-        return TestTemplateFile
 
-    def _get_temporary_file(self, tmp_path):
-        filename = os.path.join(tmp_path, 'template.py')
-        assert not os.path.exists(filename)
-        f = open(filename, 'w')
-        f.flush()
-        f.close()
+@pytest.fixture(scope='class')
+def loader():
+    # TODO: Should take the path from the input path?
+    return TemplateLoader(INPUTS)
+
+
+class TestTemplateFile:
+    _class = CountingTemplateFile
+
+    def _get_temporary_file(self, tempdir):
+        # Each test gets a new, uniquely named file in the shared
+        # directory.
+        fd, filename = tempfile.mkstemp(suffix='.py', dir=tempdir)
+        os.close(fd)
         return filename
 
-    def test_cook_check(self, tmp_path):
-        fn = self._get_temporary_file(tmp_path)
+    def test_cook_check(self, tempdir):
+        fn = self._get_temporary_file(tempdir)
         template = self._class(fn)
         template.cook_check()
         assert template.cook_count == 1
 
-    def test_auto_reload(self, tmp_path):
-        fn = self._get_temporary_file(tmp_path)
+    def test_auto_reload(self, tempdir):
+        fn = self._get_temporary_file(tempdir)
 
         # set time in past
         os.utime(fn, (0, 0))
@@ -111,29 +182,10 @@ class TestTemplateFile:
 
 
 class TestZopePageTemplates:
-    @property
-    def from_string(self):
-        from chameleon.zpt.template import PageTemplate
-        return partial(PageTemplate, keep_source=True)
-
-    @property
-    def from_file(self):
-        from chameleon.zpt.template import PageTemplateFile
-        return partial(PageTemplateFile, keep_source=True)
-
-    def template(body):
-        def decorator(func):
-            @wraps(func)
-            def wrapper(self):
-                template = self.from_string(body)
-                return func(self, template)
-
-            return wrapper
-        return decorator
+    from_string = partial(PageTemplate, keep_source=True)
+    from_file = partial(PageTemplateFile, keep_source=True)
 
     def test_syntax_error_in_strict_mode(self):
-        from chameleon.exc import ExpressionError
-
         with pytest.raises(ExpressionError):
             self.from_string(
                 """<tal:block replace='bad /// ' />""",
@@ -141,8 +193,6 @@ class TestZopePageTemplates:
             )
 
     def test_syntax_error_in_non_strict_mode(self):
-        from chameleon.exc import ExpressionError
-
         body = """<tal:block replace='bad /// ' />"""
         template = self.from_string(body, strict=False)
 
@@ -244,14 +294,14 @@ class TestZopePageTemplates:
 
     def test_encoded(self):
         filename = '074-encoded-template.pt'
-        with open(os.path.join(ROOT, 'inputs', filename), 'rb') as f:
+        with open(os.path.join(INPUTS, filename), 'rb') as f:
             body = f.read()
 
         self.from_string(body)
 
     def test_utf8_encoded(self):
         filename = '073-utf8-encoded.pt'
-        with open(os.path.join(ROOT, 'inputs', filename), 'rb') as f:
+        with open(os.path.join(INPUTS, filename), 'rb') as f:
             body = f.read()
 
         self.from_string(body)
@@ -270,14 +320,10 @@ class TestZopePageTemplates:
 
     def test_unicode_decode_error(self):
         template = self.from_file(
-            os.path.join(ROOT, 'inputs', 'greeting.pt')
+            os.path.join(INPUTS, 'greeting.pt')
         )
 
-        string = native = "the artist formerly known as ƤŗíƞĆě"
-        try:
-            string = string.decode('utf-8')
-        except AttributeError:
-            pass
+        string = "the artist formerly known as ƤŗíƞĆě"
 
         class name:
             @staticmethod
@@ -295,7 +341,7 @@ class TestZopePageTemplates:
             # There's a marker under the expression that has the
             # unicode decode error
             assert '^^^^^' in formatted
-            assert native in formatted
+            assert string in formatted
         else:
             pytest.fail("expected error")
 
@@ -310,40 +356,22 @@ class TestZopePageTemplates:
 
     def test_custom_encoding_for_str_or_bytes_in_content(self):
         string = '<div>Тест${text}</div>'
-        try:
-            string = string.decode('utf-8')
-        except AttributeError:
-            pass
 
         template = self.from_string(string, encoding="windows-1251")
 
         text = 'Тест'
 
-        try:
-            text = text.decode('utf-8')
-        except AttributeError:
-            pass
-
         rendered = template(text=text.encode('windows-1251'))
 
         assert rendered == string.replace('${text}', text)
 
     def test_custom_encoding_for_str_or_bytes_in_attributes(self):
         string = '<img tal="Тест${text}" />'
-        try:
-            string = string.decode('utf-8')
-        except AttributeError:
-            pass
 
         template = self.from_string(string, encoding="windows-1251")
 
         text = 'Тест'
 
-        try:
-            text = text.decode('utf-8')
-        except AttributeError:
-            pass
-
         rendered = template(text=text.encode('windows-1251'))
 
         assert rendered == string.replace('${text}', text)
@@ -379,7 +407,7 @@ class TestZopePageTemplates:
 
     def test_repr(self):
         template = self.from_file(
-            os.path.join(ROOT, 'inputs', 'hello_world.pt')
+            os.path.join(INPUTS, 'hello_world.pt')
         )
         assert template.filename in repr(template)
 
@@ -408,8 +436,6 @@ class TestZopePageTemplates:
         assert " />" in result2
 
     def test_exception(self):
-        from traceback import format_exception_only
-
         template = self.from_string(
             "<div tal:define=\"dummy foo\">${dummy}</div>"
         )
@@ -422,14 +448,13 @@ class TestZopePageTemplates:
             assert 'foo' in formatted
             assert '(line 1: col 23)' in formatted
 
-            formatted_exc = "\n".join(format_exception_only(type(exc), exc))
+            formatted_exc = "\n".join(
+                traceback.format_exception_only(type(exc), exc))
             assert 'NameError: foo' in formatted_exc
         else:
             pytest.fail("expected error")
 
     def test_create_formatted_exception(self):
-        from chameleon.utils import create_formatted_exception
-
         exc = create_formatted_exception(NameError('foo'), NameError, str)
         assert exc.args == ('foo', )
 
@@ -443,8 +468,6 @@ class TestZopePageTemplates:
         assert exc.bar == 'foo'
 
     def test_create_formatted_exception_no_subclass(self):
-        from chameleon.utils import create_formatted_exception
-
         class DifficultMetaClass(type):
             def __init__(self, class_name, bases, namespace):
                 if not bases == (BaseException, ):
@@ -482,7 +505,6 @@ class TestZopePageTemplates:
             pytest.fail("unexpected error")
 
     def test_double_underscore_variable(self):
-        from chameleon.exc import TranslationError
         with pytest.raises(TranslationError):
             self.from_string(
                 "<div tal:define=\"__dummy 'foo'\">${__dummy}</div>"
@@ -496,9 +518,6 @@ class TestZopePageTemplates:
         assert template() == '<!-- ${"Hello world"} -->'
 
     def test_compiler_internals_are_disallowed(self):
-        from chameleon.compiler import COMPILER_INTERNALS_OR_DISALLOWED
-        from chameleon.exc import TranslationError
-
         for name in COMPILER_INTERNALS_OR_DISALLOWED:
             body = "<d tal:define=\"{} 'foo'\">${{{}}}</d>".format(name, name)
             with pytest.raises(TranslationError):
@@ -573,17 +592,14 @@ class TestZopePageTemplates:
             "Output mismatch\n" + template.source
 
     def test_default_debug_flag(self):
-        from chameleon.config import DEBUG_MODE
         template = self.from_file(
-            os.path.join(ROOT, 'inputs', 'hello_world.pt'),
+            os.path.join(INPUTS, 'hello_world.pt'),
         )
         assert template.debug == DEBUG_MODE
         assert 'debug' not in template.__dict__
 
     def test_debug_flag_on_string(self):
-        from chameleon.loader import ModuleLoader
-
-        with open(os.path.join(ROOT, 'inputs', 'hello_world.pt')) as f:
+        with open(os.path.join(INPUTS, 'hello_world.pt')) as f:
             source = f.read()
 
         template = self.from_string(source, debug=True)
@@ -592,17 +608,14 @@ class TestZopePageTemplates:
         assert isinstance(template.loader, ModuleLoader)
 
     def test_debug_flag_on_file(self):
-        from chameleon.loader import ModuleLoader
         template = self.from_file(
-            os.path.join(ROOT, 'inputs', 'hello_world.pt'),
+            os.path.join(INPUTS, 'hello_world.pt'),
             debug=True,
         )
         assert template.debug
         assert isinstance(template.loader, ModuleLoader)
 
     def test_tag_mismatch(self):
-        from chameleon.exc import ParseError
-
         try:
             self.from_string("""
             <div metal:use-macro="layout">
@@ -639,25 +652,7 @@ class TestZopePageTemplates:
         assert template.digest(data, [])
 
     @find_files(".pt")
-    def test_pt_files(self, input_path, output_path, language):
-        from chameleon.zpt.template import PageTemplateFile
-
-        class Literal:
-            def __init__(self, s):
-                self.s = s
-
-            def __html__(self):
-                return self.s
-
-            def __str__(self):
-                raise RuntimeError(
-                    "%r is a literal." % self.s)
-
-        from chameleon.loader import TemplateLoader
-
-        # TODO: Should take the path from the input path?
-        loader = TemplateLoader(os.path.join(ROOT, "inputs"))
-
+    def test_pt_files(self, input_path, output_path, language, loader):
         self.execute(
             input_path,
             output_path,
@@ -671,14 +666,9 @@ class TestZopePageTemplates:
 
     @find_files(".txt")
     def test_txt_files(self, input_path, output_path, language):
-        from chameleon.zpt.template import PageTextTemplateFile
         self.execute(input_path, output_path, language, PageTextTemplateFile)
 
     def execute(self, input_path, output_path, language, factory, **kwargs):
-        # Make friendly title so we can locate the generated
-        # source when debugging
-        self.shortDescription = lambda: input_path
-
         # When input path contains the string 'implicit-i18n', we
         # enable "implicit translation".
         implicit_i18n = 'implicit-i18n' in input_path
@@ -695,39 +685,30 @@ class TestZopePageTemplates:
             enable_data_attributes=enable_data_attributes,
         )
 
-        params = kwargs.copy()
-        params.update({
-            'translate': self.translate,
-            'target_language': language,
-        })
-
         template.cook_check()
 
         try:
-            got = template.render(**params)
+            got = template.render(
+                translate=self.translate,
+                target_language=language,
+                **kwargs
+            )
         except BaseException:
-            import traceback
             e = traceback.format_exc()
             pytest.fail("{}\n\n    Example source:\n\n{}".format(
                 e,
                 "\n".join(
-                    ["%#03.d%s" % (lineno + 1, line and " " + line or "")
-                     for (lineno, line) in enumerate(template.source.split(
-                        '\n'))])))
+                    "%03d%s" % (lineno, " " + line if line else "")
+                    for lineno, line in enumerate(
+                        template.source.split('\n'), 1))))
 
         if isinstance(got, bytes):
             got = got.decode('utf-8')
 
-        from doctest import OutputChecker
-        checker = OutputChecker()
-
         output_filename = os.path.join(ROOT, output_path)
         with open(output_filename, 'rb') as f:
             output = f.read()
 
-        from chameleon.utils import detect_encoding
-        from chameleon.utils import read_xml_encoding
-
         if template.content_type == 'text/xml':
             encoding = read_xml_encoding(output) or \
                 template.default_encoding
@@ -736,13 +717,12 @@ class TestZopePageTemplates:
                 output, template.default_encoding)
 
         # Newline normalization across platforms
-        want = '\n'.join(output.decode(encoding).splitlines())
-        got = '\n'.join(got.splitlines())
+        want = normalize_newlines(output.decode(encoding))
+        got = normalize_newlines(got)
 
-        if checker.check_output(want, got, 0) is False:
-            from doctest import Example
+        if output_checker.check_output(want, got, 0) is False:
             example = Example(input_path, want)
-            diff = checker.output_difference(
+            diff = output_checker.output_difference(
                 example, got, 0)
             source = template.source
             pytest.fail("({}) - \n{}\n\nCode:\n{}".format(
@@ -759,8 +739,7 @@ class TestZopePageTemplates:
             default = "Message"
 
         if mapping:
-            default = re.sub(r'\${([a-z_]+)}', r'%(\1)s', default) % \
-                mapping
+            default = mapping_re.sub(r'%(\1)s', default) % mapping
 
         if target_language is None:
             return default
@@ -1,44 +1,71 @@
+import glob
+import os
+import traceback
+from doctest import Example
+from doctest import OutputChecker
 from unittest import TestCase
 
+from chameleon.tokenize import Token
+from chameleon.tokenize import iter_xml
+from chameleon.utils import read_encoded
+
+
+INPUTS = os.path.join(os.path.dirname(__file__), "inputs")
+
+# The checker holds no state between comparisons.
+output_checker = OutputChecker()
+
 
 class TokenizerTest(TestCase):
     def test_sample_files(self):
-        import os
-        import traceback
-        path = os.path.join(os.path.dirname(__file__), "inputs")
-        for filename in os.listdir(path):
-            if not filename.endswith('.xml'):
-                continue
-            f = open(os.path.join(path, filename), 'rb')
-            source = f.read()
-            f.close()
-
-            from chameleon.utils import read_encoded
+        for path in sorted(glob.glob(os.path.join(INPUTS, '*.xml'))):
+            filename = os.path.basename(path)
+            with open(path, 'rb') as f:
+                source = f.read()
+
             try:
                 want = read_encoded(source)
             except UnicodeDecodeError as exc:
                 self.fail("{} - {}".format(exc, filename))
 
-            from chameleon.tokenize import iter_xml
             try:
                 tokens = iter_xml(want)
                 got = "".join(tokens)
             except BaseException:
                 self.fail(traceback.format_exc())
 
-            from doctest import OutputChecker
-            checker = OutputChecker()
-
-            if checker.check_output(want, got, 0) is False:
-                from doctest import Example
+            if output_checker.check_output(want, got, 0) is False:
                 example = Example(f.name, want)
-                diff = checker.output_difference(
+                diff = output_checker.output_difference(
                     example, got, 0)
                 self.fail("({}) - \n{}".format(f.name, diff))
 
     def test_token(self):
-        from chameleon.tokenize import Token
         token = Token("abc", 1)
 
         self.assertTrue(isinstance(token[1:], Token))
         self.assertEqual(token[1:].pos, 2)
+
+    def test_token_location(self):
+        source = "<div>\n  <span>\n</div>"
+        token = Token("span", source.index("span"), source)
+
+        self.assertEqual(token.location, (2, 3))
+        self.assertEqual(Token("div", 1, source).location, (1, 1))
+        self.assertEqual(Token("abc", 5).location, (0, 5))
+
+    def test_token_unchanged_is_reused(self):
+        token = Token("abc", 1)
+
+        self.assertIs(token + "", token)
+        self.assertIs(token.replace("x", "y"), token)
+        self.assertIs(token.strip(), token)
+
+        stripped = Token(" abc ", 1).strip()
+        self.assertEqual(stripped, "abc")
+        self.assertEqual(stripped.pos, 2)
+
+    def test_token_strip_whitespace_only(self):
+        stripped = Token("  ", 4).strip()
+        self.assertEqual(stripped, "")
+        self.assertEqual(stripped.pos, 6)
@@ -120,7 +120,7 @@ class Token(str):
         return s
 
     def __add__(self, other: str | None) -> Token:
-        if other is None:
+        if not other:
             return self
 
         return Token(
@@ -140,6 +140,8 @@ class Token(str):
         /
     ) -> Token:
         s = str.replace(self, old, new, count)
+        if str.__eq__(s, self):
+            return self
         return Token(s, self.pos, self.source, self.filename)
 
     def split(  # type: ignore[override]
@@ -156,15 +158,23 @@ class Token(str):
         return cast('list[Token]', l_)
 
     def strip(self, chars: str | None = None, /) -> Token:
-        return self.lstrip(chars).rstrip(chars)
+        s = str.strip(self, chars)
+        if len(s) == len(self):
+            return self
+        offset = len(self) - len(str.lstrip(self, chars))
+        return Token(s, self.pos + offset, self.source, self.filename)
 
     def lstrip(self, chars: str | None = None, /) -> Token:
         s = str.lstrip(self, chars)
+        if len(s) == len(self):
+            return self
         return Token(
             s, self.pos + len(self) - len(s), self.source, self.filename)
 
     def rstrip(self, chars: str | None = None, /) -> Token:
         s = str.rstrip(self, chars)
+        if len(s) == len(self):
+            return self
         return Token(s, self.pos, self.source, self.filename)
 
     @property
@@ -172,6 +182,5 @@ class Token(str):
         if self.source is None:
             return 0, self.pos
 
-        body = self.source[:self.pos]
-        line = body.count('\n')
-        return line + 1, self.pos - body.rfind('\n', 0) - 1
+        line = self.source.count('\n', 0, self.pos)
+        return line + 1, self.pos - self.source.rfind('\n', 0, self.pos) - 1